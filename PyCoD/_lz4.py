@@ -1,26 +1,123 @@
+import ctypes
+import ctypes.util
+from functools import partial
+from struct import unpack_from
+
 try:
     # Try to import the python-lz4 package
-    import lz4.block
-
+    from lz4 import block as lz4_block
 except ImportError:
-    # If python-lz4 isn't present, fallback to using pure python
-    from io import BytesIO
+    lz4_block = None
+
+liblz4 = None
+liblz4_version = 0
+if lz4_block is None:
+    # If python-lz4 isn't present, try to use the system's liblz4 directly
+    _liblz4_path = ctypes.util.find_library('lz4')
+    if _liblz4_path is not None:
+        try:
+            liblz4 = ctypes.CDLL(_liblz4_path)
+            liblz4.LZ4_versionNumber.restype = ctypes.c_int
+            liblz4_version = liblz4.LZ4_versionNumber()
+        except (OSError, AttributeError):
+            liblz4 = None
+
+if lz4_block is not None:
+    # Use python-lz4 if present
+    __support_mode__ = 'python-lz4'
+
+    compress = partial(lz4_block.compress, store_size=False)
+
+    def uncompress(src, offset=4):
+        """uncompress a block of lz4 data using python-lz4.
+
+        The uncompressed size must be stored in the 4 bytes before offset
+        """
+        if offset < 4:
+            raise ValueError("The uncompressed size must precede the data")
+        size = unpack_from('<I', src, offset - 4)[0]
+        return lz4_block.decompress(memoryview(src)[offset:],
+                                    uncompressed_size=size,
+                                    return_bytearray=True)
+
+elif liblz4 is not None:
+    __support_mode__ = 'liblz4 %d.%d.%d (%s)' % (liblz4_version // 10000,
+                                                 liblz4_version // 100 % 100,
+                                                 liblz4_version % 100,
+                                                 _liblz4_path)
+
+    class CorruptError(Exception):
+        pass
+
+    _c_int = ctypes.c_int
+    _c_char_p = ctypes.c_char_p
+    _c_void_p = ctypes.c_void_p
+
+    _decompress_safe = liblz4.LZ4_decompress_safe
+    _decompress_safe.argtypes = (_c_void_p, _c_char_p, _c_int, _c_int)
+    _decompress_safe.restype = _c_int
+
+    _compress_bound = liblz4.LZ4_compressBound
+    _compress_bound.argtypes = (_c_int, )
+    _compress_bound.restype = _c_int
 
+    _compress_default = liblz4.LZ4_compress_default
+    _compress_default.argtypes = (_c_char_p, _c_char_p, _c_int, _c_int)
+    _compress_default.restype = _c_int
+
+    def uncompress(src, offset=4):
+        """uncompress a block of lz4 data using liblz4.
+
+        src may be any bytes-like object, bytes and writable buffers
+         (bytearray, mmap, etc.) are read without being copied
+        The uncompressed size must be stored in the 4 bytes before offset
+        """
+        if offset < 4:
+            raise ValueError("The uncompressed size must precede the data")
+        if not isinstance(src, bytes):
+            src = memoryview(src).cast('B')
+            if src.readonly:
+                src = src.tobytes()
+        if isinstance(src, bytes):
+            c_src = None
+            src_addr = ctypes.cast(src, _c_void_p).value
+        else:
+            c_src = (ctypes.c_char * len(src)).from_buffer(src)
+            src_addr = ctypes.addressof(c_src)
+
+        size = unpack_from('<I', src, offset - 4)[0]
+        dst = bytearray(size)
+        c_dst = (ctypes.c_char * size).from_buffer(dst)
+        result = _decompress_safe(src_addr + offset, c_dst,
+                                  len(src) - offset, size)
+        del c_src, c_dst
+        if result < 0:
+            raise CorruptError("liblz4 error %d" % result)
+        del dst[result:]
+        return dst
+
+    def compress(data):
+        if not isinstance(data, bytes):
+            data = bytes(data)
+        capacity = _compress_bound(len(data))
+        # liblz4 compresses straight into the returned bytearray
+        dst = bytearray(capacity)
+        c_dst = (ctypes.c_char * capacity).from_buffer(dst)
+        result = _compress_default(data, c_dst, len(data), capacity)
+        del c_dst
+        if result <= 0 and len(data) != 0:
+            raise ValueError("liblz4 failed to compress the data")
+        del dst[result:]
+        return dst
+
+else:
+    # If no LZ4 library is present, fallback to using pure python
     try:
-        from six import byte2int
-        from six.moves import xrange
+        # If Numba is present, the decode loop can be compiled to native code
+        import numpy
+        from numba import njit
     except ImportError:
-        xrange = range
-
-        # If we're running Python 3 or newer, we must
-        #  define byte2int differently than with Python 2
-        import sys
-        if sys.version_info[0] >= 3:
-            import operator
-            byte2int = operator.itemgetter(0)
-        else:
-            def byte2int(_bytes):
-                return ord(_bytes[0])
+        njit = None
 
     class CorruptError(Exception):
         pass
@@ -30,7 +127,8 @@ except ImportError:
     def uncompress(src, offset=4):
         """uncompress a block of lz4 data.
 
-        :param bytes src: lz4 compressed data (LZ4 Blocks)
+        :param bytes src: lz4 compressed data (LZ4 Blocks), any bytes-like
+                          object is accepted and read without being copied
         :param int offset: offset that the uncompressed data starts at
                            (Used to implicitly read the uncompressed data size)
         :returns: uncompressed data
@@ -38,101 +136,222 @@ except ImportError:
 
         .. seealso:: http://cyan4973.github.io/lz4/lz4_Block_format.html
         """
-        src = BytesIO(src)
-        if offset > 0:
-            src.read(offset)
-
-        # if we have the original size, we could pre-allocate the buffer with
-        # bytearray(original_size), but then we would have to use indexing
-        # instad of .append() and .extend()
-        dst = bytearray()
-        min_match_len = 4
-
-        def get_length(src, length):
-            """get the length of a lz4 variable length integer."""
-            if length != 0x0f:
-                return length
+        src = memoryview(src).cast('B')
+        src_len = len(src)
 
-            while True:
-                read_buf = src.read(1)
-                if len(read_buf) != 1:
-                    raise CorruptError("EOF at length read")
-                len_part = byte2int(read_buf)
-
-                length += len_part
-
-                if len_part != 0xff:
-                    break
+        # The uncompressed size is stored in the 4 bytes before the data,
+        #  so we can use it to pre-allocate the output buffer
+        if offset >= 4:
+            dst = bytearray(unpack_from('<I', src, offset - 4)[0])
+        else:
+            dst = bytearray()
+        pos = 0
 
-            return length
+        # Read cursor into src
+        i = offset
+        min_match_len = 4
 
         while True:
             # decode a block
-            read_buf = src.read(1)
-            if not read_buf:
+            if i >= src_len:
                 raise CorruptError("EOF at reading literal-len")
-            token = byte2int(read_buf)
-
-            literal_len = get_length(src, (token >> 4) & 0x0f)
-
-            # copy the literal to the output buffer
-            read_buf = src.read(literal_len)
-
-            if len(read_buf) != literal_len:
-                raise CorruptError("not literal data")
-            dst.extend(read_buf)
+            token = src[i]
+            i += 1
+
+            literal_len = token >> 4
+            match_len = token & 0x0f
+            end = i + literal_len
+
+            if literal_len != 0x0f and match_len != 0x0f and end + 2 < src_len:
+                # Fast path - neither length has extra bytes and this isn't
+                #  the last block, so no other checks are needed
+                dst[pos:pos + literal_len] = src[i:end]
+                pos += literal_len
+                offset = src[end] | (src[end + 1] << 8)
+                i = end + 2
+
+            else:
+                if literal_len == 0x0f:
+                    # lz4 variable length integer
+                    while True:
+                        if i >= src_len:
+                            raise CorruptError("EOF at length read")
+                        len_part = src[i]
+                        i += 1
+                        literal_len += len_part
+                        if len_part != 0xff:
+                            break
+
+                # copy the literal to the output buffer
+                if i + literal_len > src_len:
+                    raise CorruptError("not literal data")
+                dst[pos:pos + literal_len] = src[i:i + literal_len]
+                pos += literal_len
+                i += literal_len
+
+                if i == src_len:
+                    if match_len != 0:
+                        raise CorruptError(
+                            "EOF, but match-len > 0: %u" % match_len)
+                    break
 
-            read_buf = src.read(2)
-            if not read_buf:
-                if token & 0x0f != 0:
-                    raise CorruptError(
-                        "EOF, but match-len > 0: %u" % (token % 0x0f, ))
-                break
+                if i + 2 > src_len:
+                    raise CorruptError("premature EOF")
 
-            if len(read_buf) != 2:
-                raise CorruptError("premature EOF")
+                offset = src[i] | (src[i + 1] << 8)
+                i += 2
 
-            offset = byte2int([read_buf[0]]) | (byte2int([read_buf[1]]) << 8)
+                if match_len == 0x0f:
+                    while True:
+                        if i >= src_len:
+                            raise CorruptError("EOF at length read")
+                        len_part = src[i]
+                        i += 1
+                        match_len += len_part
+                        if len_part != 0xff:
+                            break
 
             if offset == 0:
                 raise CorruptError("offset can't be 0")
 
-            match_len = get_length(src, (token >> 0) & 0x0f)
             match_len += min_match_len
 
             # append the sliding window of the previous literals
-            for _ in xrange(match_len):
-                dst.append(dst[-offset])
-
+            start = pos - offset
+            if start < 0:
+                raise CorruptError("offset out of range: %u" % offset)
+            if offset >= match_len:
+                dst[pos:pos + match_len] = dst[start:start + match_len]
+            elif offset == 1:
+                # run of a single byte (RLE)
+                dst[pos:pos + match_len] = dst[start:pos] * match_len
+            else:
+                # overlapping match - repeat the pattern enough times to
+                #  cover the whole match
+                pattern = dst[start:pos] * (match_len // offset + 1)
+                dst[pos:pos + match_len] = pattern[:match_len]
+            pos += match_len
+
+        # Drop any leftover space if the stored size was too large
+        del dst[pos:]
         return dst
 
+    if njit is not None:
+        __support_mode__ = 'pure Python (Numba)'
+
+        _uncompress_py = uncompress
+
+        @njit(cache=True, boundscheck=False)
+        def _decode(src, dst, i):
+            """decode lz4 blocks from src (starting at i) into dst.
+
+            :returns: the number of bytes written to dst
+            """
+            src_len = len(src)
+            dst_len = len(dst)
+            pos = 0
+            min_match_len = 4
+
+            while True:
+                if i >= src_len:
+                    raise CorruptError("EOF at reading literal-len")
+                token = int(src[i])
+                i += 1
+
+                literal_len = token >> 4
+                if literal_len == 0x0f:
+                    while True:
+                        if i >= src_len:
+                            raise CorruptError("EOF at length read")
+                        len_part = int(src[i])
+                        i += 1
+                        literal_len += len_part
+                        if len_part != 0xff:
+                            break
+
+                if i + literal_len > src_len:
+                    raise CorruptError("not literal data")
+                if pos + literal_len > dst_len:
+                    raise CorruptError("output overrun")
+                dst[pos:pos + literal_len] = src[i:i + literal_len]
+                pos += literal_len
+                i += literal_len
+
+                if i == src_len:
+                    if token & 0x0f != 0:
+                        raise CorruptError("EOF, but match-len > 0")
+                    break
+
+                if i + 2 > src_len:
+                    raise CorruptError("premature EOF")
+
+                offset = int(src[i]) | (int(src[i + 1]) << 8)
+                i += 2
+
+                if offset == 0:
+                    raise CorruptError("offset can't be 0")
+
+                match_len = token & 0x0f
+                if match_len == 0x0f:
+                    while True:
+                        if i >= src_len:
+                            raise CorruptError("EOF at length read")
+                        len_part = int(src[i])
+                        i += 1
+                        match_len += len_part
+                        if len_part != 0xff:
+                            break
+                match_len += min_match_len
+
+                start = pos - offset
+                if start < 0:
+                    raise CorruptError("offset out of range")
+                if pos + match_len > dst_len:
+                    raise CorruptError("output overrun")
+                if offset >= match_len:
+                    dst[pos:pos + match_len] = dst[start:start + match_len]
+                else:
+                    # byte-wise copy handles overlapping matches
+                    for k in range(match_len):
+                        dst[pos + k] = dst[start + k]
+                pos += match_len
+
+            return pos
+
+        def uncompress(src, offset=4):
+            """uncompress a block of lz4 data using the compiled decoder.
+
+            The compiled decoder needs the stored uncompressed size, so
+            the regular pure Python version is used when offset < 4
+            """
+            if offset < 4:
+                return _uncompress_py(src, offset)
+            src = numpy.frombuffer(src, dtype=numpy.uint8)
+            dst = numpy.empty(unpack_from('<I', src, offset - 4)[0],
+                              dtype=numpy.uint8)
+            pos = _decode(src, dst, offset)
+            return bytearray(dst[:pos])
+
     def compress(data):
         '''
         Accepts a byte array as input - returns a LZ4 compatible (uncompressed)
          byte array
         '''
         length = len(data)
-        if length > 15:
-            result = [15 << 4 | 0]  # Add the token
-
-            # Add the literal size bytes
-            result.extend([255] * (int)((length - 15) / 255))
-            result.append((int)((length - 15) % 255))
-        else:  # length <= 15
-            result = [length << 4 | 0]  # Add the token
-            if length == 15:
-                result.append(0)  # Add the empty length byte
-
-        result.extend(data)
-        return bytearray(result)
-
-else:
-    # Use python-lz4 if present
-    __support_mode__ = 'python-lz4'
-
-    def compress(data):
-        return lz4.block.compress(data, store_size=False)
+        if length >= 15:
+            # The literal size bytes are a run of 255s followed by the rest
+            ff_count, remainder = divmod(length - 15, 255)
+            header_len = ff_count + 2
+            result = bytearray(header_len + length)
+            result[0] = 15 << 4 | 0  # Add the token
+            result[1:ff_count + 1] = b'\xff' * ff_count
+            result[ff_count + 1] = remainder
+        else:
+            header_len = 1
+            result = bytearray(header_len + length)
+            result[0] = length << 4 | 0  # Add the token
 
-    uncompress = lz4.block.decompress
+        result[header_len:] = data
+        return result
 
 support_info = 'LZ4: Using %s' % __support_mode__
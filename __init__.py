@@ -17,16 +17,40 @@
 # ##### END GPL LICENSE BLOCK #####
 
 
+# To support reload properly, try to access a package var, if it's there,
+# reload everything
+# (This must run before bpy is imported, otherwise it's always in locals())
+if "bpy" in locals():
+    import importlib
+    if "import_xmodel" in locals():
+        importlib.reload(import_xmodel)
+    if "export_xmodel" in locals():
+        importlib.reload(export_xmodel)
+    if "import_xanim" in locals():
+        importlib.reload(import_xanim)
+    if "export_xanim" in locals():
+        importlib.reload(export_xanim)
+    if "shared" in locals():
+        importlib.reload(shared)
+    if "PyCoD" in locals():
+        importlib.reload(PyCoD)
+
+else:
+    # The import / export modules (and PyCoD) are loaded on first use
+    from . import shared
+
 import bpy
-from bpy.types import Operator, AddonPreferences
+from bpy.types import Operator, AddonPreferences, OperatorFileListElement
 from bpy.props import (BoolProperty, IntProperty, FloatProperty,
                        StringProperty, EnumProperty, CollectionProperty)
-from bpy_extras.io_utils import ExportHelper, ImportHelper
+from bpy_extras.io_utils import (ExportHelper, ImportHelper,
+                                 _check_axis_conversion)
 
-from bpy.utils import register_class, unregister_class
+from bpy.utils import register_classes_factory
+from bpy.path import ensure_ext
 
-import time
-import os
+from time import process_time
+from os.path import basename, splitext
 
 bl_info = {
     "name": "BlenderCoD",
@@ -43,27 +67,103 @@ bl_info = {
 
 
 def update_submenu_mode(self, context):
-    try:
-        unregister()
-    except:
-        pass
-    register()
+    # Only the menu entries depend on this option, the classes can stay
+    unregister_menus()
+    register_menus(self.use_submenu)
+
+
+# EnumProperty items are kept at module scope so that Blender always has
+#  a live reference to them
+
+# (identifier, name, description, length in meters) for each unit_enum item
+UNITS = (('CENTI', "Centimeters", "", 0.01),
+         ('MILLI', "Millimeters", "", 0.001),
+         ('METER', "Meters", "", 1.0),
+         ('KILO', "Kilometers", "", 1000.0),
+         ('INCH', "Inches", "", 0.0254),
+         ('FOOT', "Feet", "", 0.3048),
+         ('YARD', "Yards", "", 0.9144),
+         ('MILE', "Miles", "", 1609.343994),
+         ('CUSTOM', "Custom", "", None),
+         )
+
+UNIT_ENUM_ITEMS = tuple(unit[:3] for unit in UNITS)
+
+UI_TAB_ITEMS = (('MAIN', "Main", "Main basic settings"),
+                ('ARMATURE', "Armature", "Armature-related settings"),
+                )
+
+FPS_SCALE_ITEMS = (
+    ('DISABLED', "Disabled", "No framerate adjustments are applied"),
+    ('SCENE', "Scene", "Use the scene's framerate"),
+    ('CUSTOM', "Custom", "Use custom framerate")
+)
+
+TARGET_FORMAT_XMODEL_ITEMS = (
+    ('XMODEL_EXPORT', "XMODEL_EXPORT",
+     "Raw text format used from CoD1-CoD:BO"),
+    ('XMODEL_BIN', "XMODEL_BIN",
+     "Binary model format used by CoD:BO3")
+)
 
+XMODEL_VERSION_ITEMS = (('5', "Version 5", "vCoD, CoD:UO"),
+                        ('6', "Version 6", "CoD2, CoD4, CoD:WaW, CoD:BO"),
+                        ('7', "Version 7", "CoD:BO3"))
+
+VERTEX_ALPHA_MODE_ITEMS = (
+    ('PRIMARY', "Active Layer",
+     "Use the active vertex color layer to calculate alpha"),
+    ('SECONDARY', "Secondary Layer",
+     ("Use the secondary (first inactive) vertex color layer to calculate alpha "  # nopep8
+      "(If only one layer is present, the active layer is used)")),
+)
+
+MODIFIER_QUALITY_ITEMS = (('PREVIEW', "Preview", ""),
+                          ('RENDER', "Render", ""),
+                          )
+
+TARGET_FORMAT_XANIM_ITEMS = (
+    ('XANIM_EXPORT', "XANIM_EXPORT",
+     "Raw text format used from CoD1-CoD:BO"),
+    ('XANIM_BIN', "XANIM_BIN",
+     "Binary animation format used by CoD:BO3")
+)
+
+NOTETRACK_MODE_ITEMS = (
+    ('SCENE', "Scene",
+     "Separate NT_EXPORT notetrack file for 'World at War'"),
+    ('ACTION', "Action",
+     "Separate NT_EXPORT notetrack file for 'Black Ops'")
+)
+
+NOTETRACK_FORMAT_ITEMS = (
+    ('5', "CoD 5",
+     "Separate NT_EXPORT notetrack file for 'World at War'"),
+    ('7', "CoD 7",
+     "Separate NT_EXPORT notetrack file for 'Black Ops'"),
+    ('1', "all other",
+     "Inline notetrack data for all CoD versions except WaW and BO")
+)
+
+FRAME_RANGE_MODE_ITEMS = (
+    ('SCENE', "Scene", "Use the scene's frame range"),
+    ('ACTION', "Action", "Use the frame range from each action"),
+    ('CUSTOM', "Custom", "Use a user-defined frame range")
+)
+
+# Valid target_format values (which are also the file extensions) for export
+XMODEL_FORMATS = frozenset(item[0] for item in TARGET_FORMAT_XMODEL_ITEMS)
+XANIM_FORMATS = frozenset(item[0] for item in TARGET_FORMAT_XANIM_ITEMS)
 
-def update_scale_length(self, context):
-    unit_map = {
-        'CENTI':    0.01,
-        'MILLI':    0.001,
-        'METER':    1.0,
-        'KILO':     1000.0,
-        'INCH':     0.0254,
-        'FOOT':     0.3048,
-        'YARD':     0.9144,
-        'MILE':     1609.343994,
-    }
 
-    if self.unit_enum in unit_map:
-        self.scale_length = unit_map[self.unit_enum]
+# Maps unit_enum values to their length in meters
+UNIT_SCALE_MAP = {unit[0]: unit[3] for unit in UNITS if unit[3] is not None}
+
+
+def update_scale_length(self, context):
+    scale_length = UNIT_SCALE_MAP.get(self.unit_enum)
+    if scale_length is not None:
+        self.scale_length = scale_length
 
 
 class BlenderCoD_Preferences(AddonPreferences):
@@ -76,16 +176,7 @@ class BlenderCoD_Preferences(AddonPreferences):
     )
 
     unit_enum: EnumProperty(
-        items=(('CENTI', "Centimeters", ""),
-               ('MILLI', "Millimeters", ""),
-               ('METER', "Meters", ""),
-               ('KILO', "Kilometers", ""),
-               ('INCH', "Inches", ""),
-               ('FOOT', "Feet", ""),
-               ('YARD', "Yards", ""),
-               ('MILE', "Miles", ""),
-               ('CUSTOM', "Custom", ""),
-               ),
+        items=UNIT_ENUM_ITEMS,
         name="Default Unit",
         description="The default unit to interpret one Blender Unit as when "
                     "no units are specified in the scene presets",
@@ -122,30 +213,59 @@ class BlenderCoD_Preferences(AddonPreferences):
         sub.prop(self, "scale_length")
 
 
-# To support reload properly, try to access a package var, if it's there,
-# reload everything
-if "bpy" in locals():
-    import imp
-    if "import_xmodel" in locals():
-        imp.reload(import_xmodel)
-    if "export_xmodel" in locals():
-        imp.reload(export_xmodel)
-    if "import_xanim" in locals():
-        imp.reload(import_xanim)
-    if "export_xanim" in locals():
-        imp.reload(export_xanim)
-    if "shared" in locals():
-        imp.reload(shared)
-    if "PyCoD" in locals():
-        imp.reload(PyCoD)
+def check_export_filepath(operator, target_formats):
+    '''
+    This is a modified version of the ExportHelper check() method
+    This one provides automatic checking for the file extension
+     based on what 'target_format' is (any extension in target_formats
+     is replaced)
+    '''
+    change_ext = False
+    change_axis = _check_axis_conversion(operator)
 
-else:
-    from . import import_xmodel, export_xmodel, import_xanim, export_xanim
-    from . import shared
-    from . import PyCoD
+    check_extension = operator.check_extension
+
+    if check_extension is not None:
+        filepath = operator.filepath
+        if basename(filepath):
+            # If the current extension is one of the valid extensions
+            #  (as defined by the operator), strip the extension, and ensure
+            #  that it has the correct one
+            # (needed when switching extensions)
+            base, ext = splitext(filepath)
+            if ext[1:].upper() in target_formats:
+                filepath = base
+            target_ext = '.' + operator.target_format
+            filepath = ensure_ext(filepath,
+                                  target_ext if check_extension else "")
+
+            if filepath != operator.filepath:
+                operator.filepath = filepath
+                change_ext = True
 
+    return (change_ext or change_axis)
 
-class COD_MT_import_xmodel(bpy.types.Operator, ImportHelper):
+
+class ScaleHelper(object):
+    '''
+    Mixin for the scale properties shared by all of the import / export
+     operators
+    '''
+    global_scale: FloatProperty(
+        name="Scale",
+        min=0.001, max=1000.0,
+        default=1.0,
+    )
+
+    apply_unit_scale: BoolProperty(
+        name="Apply Unit",
+        description="Scale all data according to current Blender size,"
+                    " to match CoD units",
+        default=True,
+    )
+
+
+class COD_MT_import_xmodel(bpy.types.Operator, ImportHelper, ScaleHelper):
     bl_idname = "import_scene.xmodel"
     bl_label = "Import XModel"
     bl_description = "Import a CoD XMODEL_EXPORT / XMODEL_BIN File"
@@ -158,27 +278,12 @@ class COD_MT_import_xmodel(bpy.types.Operator, ImportHelper):
     )
 
     ui_tab: EnumProperty(
-        items=(('MAIN', "Main", "Main basic settings"),
-               ('ARMATURE', "Armature", "Armature-related settings"),
-               ),
+        items=UI_TAB_ITEMS,
         name="ui_tab",
         description="Import options categories",
         default='MAIN'
     )
 
-    global_scale: FloatProperty(
-        name="Scale",
-        min=0.001, max=1000.0,
-        default=1.0,
-    )
-
-    apply_unit_scale: BoolProperty(
-        name="Apply Unit",
-        description="Scale all data according to current Blender size,"
-                    " to match CoD units",
-        default=True,
-    )
-
     use_single_mesh: BoolProperty(
         name="Combine Meshes",
         description="Combine all meshes in the file into a single object",  # nopep8
@@ -225,7 +330,7 @@ class COD_MT_import_xmodel(bpy.types.Operator, ImportHelper):
 
     def execute(self, context):
         from . import import_xmodel
-        start_time = time.process_time()
+        start_time = process_time()
 
         keywords = self.as_keywords(ignore=("filter_glob",
                                             "check_existing",
@@ -235,7 +340,7 @@ class COD_MT_import_xmodel(bpy.types.Operator, ImportHelper):
 
         if not result:
             self.report({'INFO'}, "Import finished in %.4f sec." %
-                        (time.process_time() - start_time))
+                        (process_time() - start_time))
             return {'FINISHED'}
         else:
             self.report({'ERROR'}, result)
@@ -271,7 +376,7 @@ class COD_MT_import_xmodel(bpy.types.Operator, ImportHelper):
             col.prop(self, 'use_parents')
 
 
-class COD_MT_import_xanim(bpy.types.Operator, ImportHelper):
+class COD_MT_import_xanim(bpy.types.Operator, ImportHelper, ScaleHelper):
     bl_idname = "import_scene.xanim"
     bl_label = "Import XAnim"
     bl_description = "Import a CoD XANIM_EXPORT / XANIM_BIN File"
@@ -283,20 +388,7 @@ class COD_MT_import_xanim(bpy.types.Operator, ImportHelper):
         options={'HIDDEN'}
     )
 
-    files: CollectionProperty(type=bpy.types.PropertyGroup)
-
-    global_scale: FloatProperty(
-        name="Scale",
-        min=0.001, max=1000.0,
-        default=1.0,
-    )
-
-    apply_unit_scale: BoolProperty(
-        name="Apply Unit",
-        description="Scale all data according to current Blender size,"
-                    " to match CoD units",
-        default=True,
-    )
+    files: CollectionProperty(type=OperatorFileListElement)
 
     use_actions: BoolProperty(
         name="Import as Action(s)",
@@ -328,10 +420,7 @@ class COD_MT_import_xanim(bpy.types.Operator, ImportHelper):
     fps_scale_type: EnumProperty(
         name="Scale FPS",
         description="Automatically convert all imported animation(s) to the specified framerate",   # nopep8
-        items=(('DISABLED', "Disabled", "No framerate adjustments are applied"),   # nopep8
-               ('SCENE', "Scene", "Use the scene's framerate"),
-               ('CUSTOM', "Custom", "Use custom framerate")
-               ),
+        items=FPS_SCALE_ITEMS,
         default='DISABLED',
     )
 
@@ -366,18 +455,15 @@ class COD_MT_import_xanim(bpy.types.Operator, ImportHelper):
 
     def execute(self, context):
         from . import import_xanim
-        start_time = time.process_time()
+        start_time = process_time()
 
-        ignored_properties = ("filter_glob", "files", "apply_unit_scale")
-        result = import_xanim.load(
-            self,
-            context,
-            self.apply_unit_scale,
-            **self.as_keywords(ignore=ignored_properties))
+        keywords = self.as_keywords(ignore=("filter_glob", "files"))
+        apply_unit_scale = keywords.pop("apply_unit_scale")
+        result = import_xanim.load(self, context, apply_unit_scale, **keywords)
 
         if not result:
             self.report({'INFO'}, "Import finished in %.4f sec." %
-                        (time.process_time() - start_time))
+                        (process_time() - start_time))
             return {'FINISHED'}
         else:
             self.report({'ERROR'}, result)
@@ -418,7 +504,7 @@ class COD_MT_import_xanim(bpy.types.Operator, ImportHelper):
         layout.prop(self, 'anim_offset')
 
 
-class COD_MT_export_xmodel(bpy.types.Operator, ExportHelper):
+class COD_MT_export_xmodel(bpy.types.Operator, ExportHelper, ScaleHelper):
     bl_idname = "export_scene.xmodel"
     bl_label = 'Export XModel'
     bl_description = "Export a CoD XMODEL_EXPORT / XMODEL_BIN File"
@@ -428,31 +514,23 @@ class COD_MT_export_xmodel(bpy.types.Operator, ExportHelper):
     filter_glob: StringProperty(
         default="*.XMODEL_EXPORT;*.XMODEL_BIN", options={'HIDDEN'})
 
+    # The target_format values double as the file extensions
+    target_formats = XMODEL_FORMATS
+
     # List of operator properties, the attributes will be assigned
     # to the class instance from the operator settings before calling.
 
-    # Used to map target_format values to actual file extensions
-    format_ext_map = {
-        'XMODEL_EXPORT': '.XMODEL_EXPORT',
-        'XMODEL_BIN': '.XMODEL_BIN'
-    }
-
     target_format: EnumProperty(
         name="Format",
         description="The target format to export to",
-        items=(('XMODEL_EXPORT', "XMODEL_EXPORT",
-                "Raw text format used from CoD1-CoD:BO"),
-               ('XMODEL_BIN', "XMODEL_BIN",
-                "Binary model format used by CoD:BO3")),
+        items=TARGET_FORMAT_XMODEL_ITEMS,
         default='XMODEL_EXPORT'
     )
 
     version: EnumProperty(
         name="Version",
         description="XMODEL_EXPORT format version for export",
-        items=(('5', "Version 5", "vCoD, CoD:UO"),
-               ('6', "Version 6", "CoD2, CoD4, CoD:WaW, CoD:BO"),
-               ('7', "Version 7", "CoD:BO3")),
+        items=XMODEL_VERSION_ITEMS,
         default='6'
     )
 
@@ -463,19 +541,6 @@ class COD_MT_export_xmodel(bpy.types.Operator, ExportHelper):
         default=False
     )
 
-    global_scale: FloatProperty(
-        name="Scale",
-        min=0.001, max=1000.0,
-        default=1.0,
-    )
-
-    apply_unit_scale: BoolProperty(
-        name="Apply Unit",
-        description="Scale all data according to current Blender size,"
-                    " to match CoD units",
-        default=True,
-    )
-
     use_vertex_colors: BoolProperty(
         name="Vertex Colors",
         description=("Export vertex colors "
@@ -495,12 +560,7 @@ class COD_MT_export_xmodel(bpy.types.Operator, ExportHelper):
     use_vertex_colors_alpha_mode: EnumProperty(
         name="Vertex Alpha Source Layer",
         description="The target vertex color layer to use for calculating the alpha values",  # nopep8
-        items=(('PRIMARY', "Active Layer",
-                "Use the active vertex color layer to calculate alpha"),
-               ('SECONDARY', "Secondary Layer",
-                ("Use the secondary (first inactive) vertex color layer to calculate alpha "  # nopep8
-                 "(If only one layer is present, the active layer is used)")),
-               ),
+        items=VERTEX_ALPHA_MODE_ITEMS,
         default='PRIMARY'
     )
 
@@ -521,9 +581,7 @@ class COD_MT_export_xmodel(bpy.types.Operator, ExportHelper):
     modifier_quality: EnumProperty(
         name="Modifier Quality",
         description="The quality at which to apply mesh modifiers",
-        items=(('PREVIEW', "Preview", ""),
-               ('RENDER', "Render", ""),
-               ),
+        items=MODIFIER_QUALITY_ITEMS,
         default='PREVIEW'
     )
 
@@ -575,7 +633,7 @@ class COD_MT_export_xmodel(bpy.types.Operator, ExportHelper):
 
     def execute(self, context):
         from . import export_xmodel
-        start_time = time.process_time()
+        start_time = process_time()
 
         ignore = ("filter_glob", "check_existing")
         result = export_xmodel.save(self, context,
@@ -583,7 +641,7 @@ class COD_MT_export_xmodel(bpy.types.Operator, ExportHelper):
 
         if not result:
             self.report({'INFO'}, "Export finished in %.4f sec." %
-                        (time.process_time() - start_time))
+                        (process_time() - start_time))
             return {'FINISHED'}
         else:
             self.report({'ERROR'}, result)
@@ -594,39 +652,7 @@ class COD_MT_export_xmodel(bpy.types.Operator, ExportHelper):
         return (context.scene is not None)
 
     def check(self, context):
-        '''
-        This is a modified version of the ExportHelper check() method
-        This one provides automatic checking for the file extension
-         based on what 'target_format' is (through 'format_ext_map')
-        '''
-        import os
-        from bpy_extras.io_utils import _check_axis_conversion
-        change_ext = False
-        change_axis = _check_axis_conversion(self)
-
-        check_extension = self.check_extension
-
-        if check_extension is not None:
-            filepath = self.filepath
-            if os.path.basename(filepath):
-                # If the current extension is one of the valid extensions
-                #  (as defined by this class), strip the extension, and ensure
-                #  that it has the correct one
-                # (needed when switching extensions)
-                base, ext = os.path.splitext(filepath)
-                if ext[1:] in self.format_ext_map:
-                    filepath = base
-                target_ext = self.format_ext_map[self.target_format]
-                filepath = bpy.path.ensure_ext(filepath,
-                                               target_ext
-                                               if check_extension
-                                               else "")
-
-                if filepath != self.filepath:
-                    self.filepath = filepath
-                    change_ext = True
-
-        return (change_ext or change_axis)
+        return check_export_filepath(self, self.target_formats)
 
     # Extend ExportHelper invoke function to support dynamic default values
     def invoke(self, context, event):
@@ -647,9 +673,8 @@ class COD_MT_export_xmodel(bpy.types.Operator, ExportHelper):
 
         # Calculate number of selected mesh objects
         if context.mode in ('OBJECT', 'PAINT_WEIGHT'):
-            objects = bpy.data.objects
-            meshes_selected = len(
-                [m for m in objects if m.type == 'MESH' and m.select_get()])
+            meshes_selected = sum(
+                1 for ob in context.selected_objects if ob.type == 'MESH')
         else:
             meshes_selected = 0
 
@@ -696,7 +721,7 @@ class COD_MT_export_xmodel(bpy.types.Operator, ExportHelper):
         sub.prop(self, 'use_weight_min_threshold')
 
 
-class COD_MT_export_xanim(bpy.types.Operator, ExportHelper):
+class COD_MT_export_xanim(bpy.types.Operator, ExportHelper, ScaleHelper):
     bl_idname = "export_scene.xanim"
     bl_label = 'Export XAnim'
     bl_description = "Export a CoD XANIM_EXPORT / XANIM_BIN File"
@@ -706,19 +731,13 @@ class COD_MT_export_xanim(bpy.types.Operator, ExportHelper):
     filter_glob: StringProperty(
         default="*.XANIM_EXPORT;*.XANIM_BIN", options={'HIDDEN'})
 
-    # Used to map target_format values to actual file extensions
-    format_ext_map = {
-        'XANIM_EXPORT': '.XANIM_EXPORT',
-        'XANIM_BIN': '.XANIM_BIN'
-    }
+    # The target_format values double as the file extensions
+    target_formats = XANIM_FORMATS
 
     target_format: EnumProperty(
         name="Format",
         description="The target format to export to",
-        items=(('XANIM_EXPORT', "XANIM_EXPORT",
-                "Raw text format used from CoD1-CoD:BO"),
-               ('XANIM_BIN', "XANIM_BIN",
-                "Binary animation format used by CoD:BO3")),
+        items=TARGET_FORMAT_XANIM_ITEMS,
         default='XANIM_EXPORT'
     )
 
@@ -728,19 +747,6 @@ class COD_MT_export_xanim(bpy.types.Operator, ExportHelper):
         default=False
     )
 
-    global_scale: FloatProperty(
-        name="Scale",
-        min=0.001, max=1000.0,
-        default=1.0,
-    )
-
-    apply_unit_scale: BoolProperty(
-        name="Apply Unit",
-        description="Scale all data according to current Blender size,"
-                    " to match CoD units",
-        default=True,
-    )
-
     use_all_actions: BoolProperty(
         name="Export All Actions",
         description="Export *all* actions rather than just the active one",
@@ -766,10 +772,7 @@ class COD_MT_export_xanim(bpy.types.Operator, ExportHelper):
     use_notetrack_mode: EnumProperty(
         name="Notetrack Mode",
         description="Notetrack format to use. Always set 'CoD 7' for Black Ops, even if not using notetrack!",   # nopep8
-        items=(('SCENE', "Scene",
-                "Separate NT_EXPORT notetrack file for 'World at War'"),
-               ('ACTION', "Action",
-                "Separate NT_EXPORT notetrack file for 'Black Ops'")),
+        items=NOTETRACK_MODE_ITEMS,
         default='ACTION'
     )
 
@@ -778,13 +781,7 @@ class COD_MT_export_xanim(bpy.types.Operator, ExportHelper):
         description=("Notetrack format to use. "
                      "Always set 'CoD 7' for Black Ops, "
                      "even if not using notetrack!"),
-        items=(('5', "CoD 5",
-                "Separate NT_EXPORT notetrack file for 'World at War'"),
-               ('7', "CoD 7",
-                "Separate NT_EXPORT notetrack file for 'Black Ops'"),
-               ('1', "all other",
-                "Inline notetrack data for all CoD versions except WaW and BO")
-               ),
+        items=NOTETRACK_FORMAT_ITEMS,
         default='1'
     )
 
@@ -798,9 +795,7 @@ class COD_MT_export_xanim(bpy.types.Operator, ExportHelper):
     use_frame_range_mode: EnumProperty(
         name="Frame Range Mode",
         description="Decides what to use for the frame range",
-        items=(('SCENE', "Scene", "Use the scene's frame range"),
-               ('ACTION', "Action", "Use the frame range from each action"),
-               ('CUSTOM', "Custom", "Use a user-defined frame range")),
+        items=FRAME_RANGE_MODE_ITEMS,
         default='ACTION'
     )
 
@@ -836,14 +831,14 @@ class COD_MT_export_xanim(bpy.types.Operator, ExportHelper):
 
     def execute(self, context):
         from . import export_xanim
-        start_time = time.process_time()
+        start_time = process_time()
         result = export_xanim.save(
             self,
             context,
             **self.as_keywords(ignore=("filter_glob", "check_existing")))
 
         if not result:
-            msg = "Export finished in %.4f sec." % (time.process_time() - start_time)
+            msg = "Export finished in %.4f sec." % (process_time() - start_time)
             self.report({'INFO'}, msg)
             return {'FINISHED'}
         else:
@@ -855,39 +850,7 @@ class COD_MT_export_xanim(bpy.types.Operator, ExportHelper):
         return (context.scene is not None)
 
     def check(self, context):
-        '''
-        This is a modified version of the ExportHelper check() method
-        This one provides automatic checking for the file extension
-         based on what 'target_format' is (through 'format_ext_map')
-        '''
-        import os
-        from bpy_extras.io_utils import _check_axis_conversion
-        change_ext = False
-        change_axis = _check_axis_conversion(self)
-
-        check_extension = self.check_extension
-
-        if check_extension is not None:
-            filepath = self.filepath
-            if os.path.basename(filepath):
-                # If the current extension is one of the valid extensions
-                #  (as defined by this class), strip the extension, and ensure
-                #  that it has the correct one
-                # (needed when switching extensions)
-                base, ext = os.path.splitext(filepath)
-                if ext[1:] in self.format_ext_map:
-                    filepath = base
-                target_ext = self.format_ext_map[self.target_format]
-                filepath = bpy.path.ensure_ext(filepath,
-                                               target_ext
-                                               if check_extension
-                                               else "")
-
-                if filepath != self.filepath:
-                    self.filepath = filepath
-                    change_ext = True
-
-        return (change_ext or change_axis)
+        return check_export_filepath(self, self.target_formats)
 
     '''
     # Extend ExportHelper invoke function to support dynamic default values
@@ -929,12 +892,13 @@ class COD_MT_export_xanim(bpy.types.Operator, ExportHelper):
 
             ex_num = action_count - 1
             ex_action = bpy.data.actions[ex_num].name
-            ex_base = os.path.splitext(os.path.basename(self.filepath))[0]
+            ex_base = splitext(basename(self.filepath))[0]
 
             try:
                 icon = 'NONE'
                 from . import export_xanim
-                template = export_xanim.CustomTemplate(self.filename_format)
+                template = export_xanim.get_filename_template(
+                    self.filename_format)
                 example = template.format(ex_action, ex_base, ex_num)
             except Exception as err:
                 icon = 'ERROR'
@@ -977,8 +941,7 @@ class COD_MT_import_submenu(bpy.types.Menu):
     bl_label = "Call of Duty"
 
     def draw(self, context):
-        menu_func_xmodel_import(self, context)
-        menu_func_xanim_import(self, context)
+        menu_func_cod_import(self, context)
 
 
 class COD_MT_export_submenu(bpy.types.Menu):
@@ -986,36 +949,60 @@ class COD_MT_export_submenu(bpy.types.Menu):
     bl_label = "Call of Duty"
 
     def draw(self, context):
-        menu_func_xmodel_export(self, context)
-        menu_func_xanim_export(self, context)
+        menu_func_cod_export(self, context)
 
 
-def menu_func_xmodel_import(self, context):
-    self.layout.operator(COD_MT_import_xmodel.bl_idname,
-                         text="CoD XModel (.XMODEL_EXPORT, .XMODEL_BIN)")
+def make_operator_menu_func(bl_idname, text):
+    '''
+    Create a menu function that draws a button for the given operator
+    '''
+    def menu_func(self, context):
+        self.layout.operator(bl_idname, text=text)
+    return menu_func
 
 
-def menu_func_xanim_import(self, context):
-    self.layout.operator(COD_MT_import_xanim.bl_idname,
-                         text="CoD XAnim (.XANIM_EXPORT, .XANIM_BIN)")
+def make_submenu_menu_func(bl_idname, text):
+    '''
+    Create a menu function that draws the given submenu
+    '''
+    def menu_func(self, context):
+        self.layout.menu(bl_idname, text=text)
+    return menu_func
 
 
-def menu_func_xmodel_export(self, context):
-    self.layout.operator(COD_MT_export_xmodel.bl_idname,
-                         text="CoD XModel (.XMODEL_EXPORT, .XMODEL_BIN)")
+menu_func_xmodel_import = make_operator_menu_func(
+    COD_MT_import_xmodel.bl_idname,
+    "CoD XModel (.XMODEL_EXPORT, .XMODEL_BIN)")
 
+menu_func_xanim_import = make_operator_menu_func(
+    COD_MT_import_xanim.bl_idname,
+    "CoD XAnim (.XANIM_EXPORT, .XANIM_BIN)")
 
-def menu_func_xanim_export(self, context):
-    self.layout.operator(COD_MT_export_xanim.bl_idname,
-                         text="CoD XAnim (.XANIM_EXPORT, .XANIM_BIN)")
+menu_func_xmodel_export = make_operator_menu_func(
+    COD_MT_export_xmodel.bl_idname,
+    "CoD XModel (.XMODEL_EXPORT, .XMODEL_BIN)")
 
+menu_func_xanim_export = make_operator_menu_func(
+    COD_MT_export_xanim.bl_idname,
+    "CoD XAnim (.XANIM_EXPORT, .XANIM_BIN)")
 
-def menu_func_import_submenu(self, context):
-    self.layout.menu(COD_MT_import_submenu.bl_idname, text="Call of Duty")
 
+# Draw both operators from one function so each menu only gets one callback
+def menu_func_cod_import(self, context):
+    menu_func_xmodel_import(self, context)
+    menu_func_xanim_import(self, context)
 
-def menu_func_export_submenu(self, context):
-    self.layout.menu(COD_MT_export_submenu.bl_idname, text="Call of Duty")
+
+def menu_func_cod_export(self, context):
+    menu_func_xmodel_export(self, context)
+    menu_func_xanim_export(self, context)
+
+
+menu_func_import_submenu = make_submenu_menu_func(
+    COD_MT_import_submenu.bl_idname, "Call of Duty")
+
+menu_func_export_submenu = make_submenu_menu_func(
+    COD_MT_export_submenu.bl_idname, "Call of Duty")
 
 
 '''
@@ -1033,43 +1020,50 @@ classes = (
     COD_MT_export_submenu
 )
 
+# The returned unregister function removes the classes in reverse order
+register_classes, unregister_classes = register_classes_factory(classes)
 
-def register():
-    for cls in classes:
-        bpy.utils.register_class(cls)
 
-    # __name__ is the same as the package name (io_scene_cod)
-    preferences = bpy.context.preferences.addons[__name__].preferences
+# (menu, draw function) pairs appended by register_menus()
+_menu_hooks = []
 
+
+def register_menus(use_submenu):
     # Each of these appended functions is executed every time the
     # corresponding menu list is shown
-    if not preferences.use_submenu:
-        bpy.types.TOPBAR_MT_file_import.append(menu_func_xmodel_import)
-        bpy.types.TOPBAR_MT_file_import.append(menu_func_xanim_import)
-        bpy.types.TOPBAR_MT_file_export.append(menu_func_xmodel_export)
-        bpy.types.TOPBAR_MT_file_export.append(menu_func_xanim_export)
+    file_import = bpy.types.TOPBAR_MT_file_import
+    file_export = bpy.types.TOPBAR_MT_file_export
+    if not use_submenu:
+        _menu_hooks.extend(((file_import, menu_func_cod_import),
+                            (file_export, menu_func_cod_export)))
     else:
-        bpy.types.TOPBAR_MT_file_import.append(menu_func_import_submenu)
-        bpy.types.TOPBAR_MT_file_export.append(menu_func_export_submenu)
+        _menu_hooks.extend(((file_import, menu_func_import_submenu),
+                            (file_export, menu_func_export_submenu)))
+
+    for menu, func in _menu_hooks:
+        menu.append(func)
+
+
+def unregister_menus():
+    # Only remove what was actually appended - the preferences may have
+    #  already been changed by the time this runs
+    for menu, func in _menu_hooks:
+        menu.remove(func)
+    _menu_hooks.clear()
+
+
+def register():
+    register_classes()
+
+    # __name__ is the same as the package name (io_scene_cod)
+    preferences = bpy.context.preferences.addons[__name__].preferences
 
-    # Set the global 'plugin_preferences' variable for each module
-    from . import shared as shared
-    shared.plugin_preferences = preferences
+    register_menus(preferences.use_submenu)
 
 
 def unregister():
-    # You have to try to unregister both types of the menus here because
-    # the preferences will have already been changed by the time this func runs
-    bpy.types.TOPBAR_MT_file_import.remove(menu_func_xmodel_import)
-    bpy.types.TOPBAR_MT_file_import.remove(menu_func_xanim_import)
-    bpy.types.TOPBAR_MT_file_export.remove(menu_func_xmodel_export)
-    bpy.types.TOPBAR_MT_file_export.remove(menu_func_xanim_export)
-
-    bpy.types.TOPBAR_MT_file_import.remove(menu_func_import_submenu)
-    bpy.types.TOPBAR_MT_file_export.remove(menu_func_export_submenu)
-
-    for cls in classes:
-        bpy.utils.unregister_class(cls)
+    unregister_menus()
+    unregister_classes()
 
 
 if __name__ == "__main__":
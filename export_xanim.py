@@ -20,6 +20,8 @@
 
 import os
 import bpy
+import numpy
+from functools import lru_cache
 from string import Template
 
 from . import shared as shared
@@ -37,17 +39,35 @@ class CustomTemplate(Template):
         return self.substitute(args)
 
 
+@lru_cache(maxsize=16)
+def get_filename_template(filename_format):
+    '''
+    Get the CustomTemplate for a filename format string
+    (Cached, since the export panel asks for it on every redraw)
+    '''
+    return CustomTemplate(filename_format)
+
+
 def calc_frame_range(action):
     '''
     action.frame_range is inaccurate for actions with 0 or 1 keyframe(s)
     This function returns the real (inclusive) frame range for a given action
     '''
-    if len(action.fcurves) == 0:
-        return (0, 0)
     keys = [fcurve.keyframe_points for fcurve in action.fcurves]
-    points = [point for keyframe_points in keys for point in keyframe_points]
-    frames = [point.co[0] for point in points]
-    return (min(frames), max(frames))
+    count = sum(len(keyframe_points) for keyframe_points in keys)
+    if count == 0:
+        return (0, 0)
+
+    # Read the (frame, value) pairs of every keyframe into one array
+    co = numpy.empty(count * 2, dtype=numpy.float32)
+    start = 0
+    for keyframe_points in keys:
+        end = start + len(keyframe_points) * 2
+        keyframe_points.foreach_get('co', co[start:end])
+        start = end
+
+    frames = co[0::2]
+    return (float(frames.min()), float(frames.max()))
 
 
 def export_action(self, context, progress, action,
@@ -70,31 +90,48 @@ def export_action(self, context, progress, action,
     anim.framerate = framerate
 
     # Determine which bones will be exported for this action
+    all_bones = ob.pose.bones
     if use_selection:
         pose_bones = context.selected_pose_bones
     else:
-        pose_bones = ob.pose.bones
+        pose_bones = all_bones
 
     for bone in pose_bones:
         anim.parts.append(XAnim.PartInfo(bone.name))
 
+    # The pose matrices of all bones are read with a single foreach_get()
+    #  each frame. They're stored column-major, so [:3, :3] is already the
+    #  transposed rotation and [3, :3] is the bone's head
+    bone_indices = [all_bones.find(bone.name) for bone in pose_bones]
+    matrix_buffer = numpy.empty(len(all_bones) * 16, dtype=numpy.float32)
+    matrices = matrix_buffer.reshape(-1, 4, 4)
+
     # Fallback to ACTION frame range mode if none set
     if frame_range is None:
         frame_range = calc_frame_range(action)
 
-    for frame_number in range(int(frame_range[0]), int(frame_range[1]) + 1):
+    # Local bindings for the frame loop
+    frame_set = context.scene.frame_set
+    get_matrices = all_bones.foreach_get
+    Frame = XAnim.Frame
+    FramePart = XAnim.FramePart
+
+    frame_numbers = range(int(frame_range[0]), int(frame_range[1]) + 1)
+    anim.frames = [None] * len(frame_numbers)
+    for frame_index, frame_number in enumerate(frame_numbers):
         # Set frame directly
-        context.scene.frame_set(frame_number)
+        frame_set(frame_number)
 
         # Add the animation data for each bone
-        frame = XAnim.Frame(frame_number)
-        for bone in pose_bones:
-            offset = tuple(bone.head * global_scale)
-            m = bone.matrix.to_3x3().transposed()
-            matrix = [tuple(v) for v in m]
-            part = XAnim.FramePart(offset, matrix)
-            frame.parts.append(part)
-        anim.frames.append(frame)
+        get_matrices('matrix', matrix_buffer)
+        bone_matrices = matrices[bone_indices]
+        offsets = (bone_matrices[:, 3, :3] * global_scale).tolist()
+        rotations = bone_matrices[:, :3, :3].tolist()
+
+        frame = Frame(frame_number)
+        frame.parts = [FramePart(offset, matrix)
+                       for offset, matrix in zip(offsets, rotations)]
+        anim.frames[frame_index] = frame
 
     if use_notetracks:
         if use_notetrack_mode == 'SCENE':
@@ -105,8 +142,13 @@ def export_action(self, context, progress, action,
             # This should never happen!
             markers = []
 
-        notes = [XAnim.Note(marker.frame, marker.name) for marker in markers]
-        anim.notes = notes
+        # The marker frames are read in one call, only the names need to be
+        #  fetched per marker
+        frames = [0] * len(markers)
+        if frames:
+            markers.foreach_get('frame', frames)
+        anim.notes = [XAnim.Note(frame, marker.name)
+                      for frame, marker in zip(frames, markers)]
 
     # Write the XANIM_EXPORT file (and NT_EXPORT file if enabled)
     header_msg = shared.get_metadata_string(filepath)
@@ -145,8 +187,8 @@ def save(self, context, filepath="",
     if apply_unit_scale:
         global_scale /= shared.calculate_unit_scale_factor(context.scene)
 
-    ob = bpy.context.object
-    if ob.type != 'ARMATURE':
+    ob = context.object
+    if ob is None or ob.type != 'ARMATURE':
         return "An armature must be selected!"
 
     if ob.animation_data is None:
@@ -178,7 +220,7 @@ def save(self, context, filepath="",
     else:
         frame_range = None
 
-    filename_format = CustomTemplate(filename_format)
+    filename_format = get_filename_template(filename_format)
     path = os.path.dirname(filepath) + os.sep
     basename, ext = os.path.splitext(os.path.basename(filepath))
     for index, action in enumerate(actions):
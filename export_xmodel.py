@@ -21,6 +21,7 @@
 import bpy
 import bmesh
 import os
+import numpy
 from itertools import repeat
 
 from . import shared as shared
@@ -46,7 +47,8 @@ def mesh_triangulate(mesh, vertex_cleanup):
     bm.to_mesh(mesh)
     bm.free()
 
-    mesh.update(calc_edges=True)
+    # BMesh writes the edges itself, they don't need to be recalculated
+    mesh.update()
 
 
 def gather_exportable_objects(self, context,
@@ -75,12 +77,16 @@ def gather_exportable_objects(self, context,
             context.active_object.type == 'ARMATURE'):
         armature = context.active_object
 
-    # A list of objects we need to check *after* we find an armature
-    # Used when use_armature_filter is enabled because we can't check
-    #  the modifiers if we don't know what armature we're using yet
-    secondary_objects = []
+    # Otherwise use the first armature in the scene
+    # The armature is decided up front so every mesh can be run through
+    #  the armature filter in a single pass
+    if armature is None and use_armature:
+        for ob in context.scene.objects:
+            if ob.type == 'ARMATURE' and len(ob.data.bones) > 0:
+                armature = ob
+                break
 
-    def test_armature_filter(object):
+    def test_armature_filter(ob):
         """
         Test an object against the armature filter
         returns True if the object passed
@@ -91,42 +97,22 @@ def gather_exportable_objects(self, context,
                 return True
         return False
 
-    for ob in bpy.data.objects:
-        # Either grab the active armature - or the first armature in the scene
-        if (ob.type == 'ARMATURE' and use_armature and
-            (armature is None or ob == context.active_object) and
-                len(ob.data.bones) > 0):
-            armature = ob
-            continue
-
+    for ob in context.scene.objects:
         if ob.type != 'MESH':
             continue
 
         if use_selection and not ob.select_get():
             continue
 
-        if use_armature_filter:
-            if armature is None:
-                # Defer the check for this object until *after* we know
-                #  which armature we're using
-                secondary_objects.append(ob)
-            else:
-                if test_armature_filter(ob):
-                    obs.append(ob)
+        if use_armature_filter and not test_armature_filter(ob):
             continue
-        obs.append(ob)
 
-    # Perform a secondary filter pass on all objects we missed
-    #  (before the armature was found)
-    if use_armature_filter:
-        for ob in secondary_objects:
-            if test_armature_filter(ob):
-                obs.append(ob)
+        obs.append(ob)
 
     # Fallback to exporting only the selected object if we couldn't find any
     if armature is None:
         if len(obs) == 0 and context.active_object is not None:
-            if ob.type == 'MESH':
+            if context.active_object.type == 'MESH':
                 obs = [context.active_object]
 
     return armature, obs
@@ -184,9 +170,12 @@ class ExportMesh(object):
         self.materials = []
         self.gen_material_indices(model_materials)
 
-    def clear(self):
-        self.mesh.user_clear()
-        bpy.data.meshes.remove(self.mesh)
+    def clear(self, depsgraph):
+        '''
+        Free the temporary mesh created by to_mesh()
+        '''
+        self.object.evaluated_get(depsgraph).to_mesh_clear()
+        self.mesh = None
 
     # find places where we have too many weights and remove the lowest weights, then renormalize the total
     def fix_too_many_weights(self):
@@ -217,10 +206,10 @@ class ExportMesh(object):
                 self.weights[i] = [(0, 1.0)]
         else:
             # group_map[group_index] yields bone index or None
-            group_map = [None] * len(ob.vertex_groups)
-            for group_index, group in enumerate(ob.vertex_groups):
-                if group.name in bone_table:
-                    group_map[group_index] = bone_table.index(group.name)
+            bone_indices = {name: index
+                            for index, name in enumerate(bone_table)}
+            group_map = [bone_indices.get(group.name)
+                         for group in ob.vertex_groups]
 
             for vert_index, vert in enumerate(self.mesh.vertices):
                 for group in vert.groups:
@@ -244,13 +233,13 @@ class ExportMesh(object):
 
 
     def gen_material_indices(self, model_materials):
-        self.materials = [None] * len(self.mesh.materials)
-        for material_index, material in enumerate(self.mesh.materials):
-            if material in model_materials:
-                self.materials[material_index] = model_materials.index(material)  # nopep8
-            else:
-                self.materials[material_index] = len(model_materials)
-                model_materials.append(material)
+        '''
+        model_materials maps each material to its index in the model
+         (in insertion order) - new materials are added to the end
+        '''
+        self.materials = [model_materials.setdefault(material,
+                                                     len(model_materials))
+                          for material in self.mesh.materials]
 
     def to_xmodel_mesh(self,
                        use_alpha=False,
@@ -285,47 +274,64 @@ class ExportMesh(object):
 
         # mesh.calc_tessface()  # Is this needed?
 
-        for vert_index, vert in enumerate(self.mesh.vertices):
-            mesh_vert = XModel.Vertex()
-            mesh_vert.offset = tuple(vert.co * global_scale)
-            mesh_vert.weights = self.weights[vert_index]
-            mesh.verts.append(mesh_vert)
-
-        for polygon in self.mesh.polygons:
+        # Read all of the vertex coordinates at once
+        co = numpy.empty(len(self.mesh.vertices) * 3, dtype=numpy.float32)
+        self.mesh.vertices.foreach_get('co', co)
+        co *= global_scale
+        co = co.tolist()
+        offsets = zip(co[0::3], co[1::3], co[2::3])
+        mesh.verts = [XModel.Vertex(offset, weights)
+                      for offset, weights in zip(offsets, self.weights)]
+
+        # Read the split normals and UVs of every loop at once
+        loop_count = len(self.mesh.loops)
+        normals = numpy.empty(loop_count * 3, dtype=numpy.float32)
+        self.mesh.loops.foreach_get('normal', normals)
+        normals = normals.reshape(loop_count, 3).tolist()
+        if uv_layer is None:
+            # Meshes without a UV map export all-zero UVs
+            uvs = numpy.zeros(loop_count * 2, dtype=numpy.float32)
+        else:
+            uvs = numpy.empty(loop_count * 2, dtype=numpy.float32)
+            uv_layer.data.foreach_get('uv', uvs)
+        # Flip the V coordinates for all loops in one pass
+        #  (in double precision, like the per-loop version did)
+        uvs = uvs.reshape(loop_count, 2).astype(numpy.float64)
+        uvs[:, 1] = 1.0 - uvs[:, 1]
+        uvs = list(map(tuple, uvs.tolist()))
+
+        # Read the color of every loop at once
+        if vc_layer is not None:
+            colors = numpy.empty(loop_count * 4, dtype=numpy.float32)
+            vc_layer.data.foreach_get('color', colors)
+            colors = colors.reshape(loop_count, 4)
+            colors[:, 3] = alpha_default
+            colors = list(map(tuple, colors.tolist()))
+        else:
+            colors = [(1.0, 1.0, 1.0, alpha_default)] * loop_count
+
+        # The mesh has been triangulated, so every polygon has 3 loops
+        poly_count = len(self.mesh.polygons)
+        material_indices = numpy.empty(poly_count, dtype=numpy.int32)
+        self.mesh.polygons.foreach_get('material_index', material_indices)
+        loop_starts = numpy.empty(poly_count, dtype=numpy.int32)
+        self.mesh.polygons.foreach_get('loop_start', loop_starts)
+        vert_indices = numpy.empty(loop_count, dtype=numpy.int32)
+        self.mesh.loops.foreach_get('vertex_index', vert_indices)
+        vert_indices = vert_indices.tolist()
+
+        for material_index, loop_start in zip(material_indices.tolist(),
+                                              loop_starts.tolist()):
             face = XModel.Face(0, 0)
-            face.material_id = self.materials[polygon.material_index]
-            if vc_layer is not None:
-                vert_colors = vc_layer.data[polygon.index]
-                poly_colors = [vert_colors.color[0],
-                               vert_colors.color[1], vert_colors.color[2]]
-
-                #! This code doesn't work anymore
-                """# Calculate alpha values for the verts for this polygon
-                if vca_layer is None:
-                    alphas = [alpha_default] * 3
-                else:
-                    vert_colors = vca_layer.data[polygon.index]
-                    alphas = [sum(vert_colors.color[0]) / 3,
-                              sum(vert_colors.color[1]) / 3,
-                              sum(vert_colors.color[2]) / 3]"""
+            face.material_id = self.materials[material_index]
 
-                colors = [(vert_colors.color[0],vert_colors.color[1], vert_colors.color[2], alpha_default)] * 4
-            else:
-                colors = [(1.0, 1.0, 1.0, alpha_default)] * 4
-            for i, loop_index in enumerate(polygon.loop_indices):
-                loop = self.mesh.loops[loop_index]
-                uv = uv_layer.data[loop_index].uv
-                vert = XModel.FaceVertex(
-                    loop.vertex_index,
-                    loop.normal,
-                    colors[i],
-                    (uv.x, 1.0 - uv.y))
-                face.indices[i] = vert
-
-            # Fix winding order (again)
-            tmp = face.indices[2]
-            face.indices[2] = face.indices[1]
-            face.indices[1] = tmp
+            # The last two corners are swapped to fix the winding order
+            face.indices = [
+                XModel.FaceVertex(vert_indices[loop_index],
+                                  normals[loop_index],
+                                  colors[loop_index],
+                                  uvs[loop_index])
+                for loop_index in (loop_start, loop_start + 2, loop_start + 1)]
 
             mesh.faces.append(face)
 
@@ -364,9 +370,9 @@ def save(self, context, filepath,
     else:
         last_mode = 'OBJECT'
 
-        for ob in bpy.data.objects:
+        for ob in context.view_layer.objects:
             if ob.type == 'MESH':
-                context.scene.objects.active = ob
+                context.view_layer.objects.active = ob
                 break
         else:
             return "No mesh to export."
@@ -458,7 +464,7 @@ def save(self, context, filepath,
 
     return result
 
-tbl_cosmetics = [
+tbl_cosmetics = frozenset([
     "j_teeth_lower", "j_teeth_upper", "j_tongue", "j_brow_a01", "j_brow_a01_le", "j_brow_a01_ri", "j_brow_a03_le", "j_brow_a03_ri",
     "j_brow_a05_le", "j_brow_a05_ri", "j_brow_a07_le", "j_brow_a07_ri", "j_brow_a09_le", "j_brow_a09_ri", "j_brow_b01_le",
     "j_brow_b01_ri", "j_cheek_a03_le", "j_cheek_a01_ri", "j_cheek_a01_le", "j_brow_b05_ri", "j_brow_b05_le", "j_brow_b03_ri", "j_brow_b03_le"
@@ -481,7 +487,7 @@ tbl_cosmetics = [
     , "j_nose_c03_ri", "j_nose_c03_le", "j_nose_c01_ri", "j_nose_c01_le", "j_nose_c01", "j_nose_b01_ri", "j_nose_b01_le", "j_nose_b01", "j_nose_a01_ri"
     , "j_uppercheek_a08_le", "j_uppercheek_a07_ri", "j_uppercheek_a07_le", "j_uppercheek_a05_ri", "j_uppercheek_a05_le", "j_uppercheek_a03_ri", "j_uppercheek_a03_le", "j_uppercheek_a01_ri", "j_uppercheek_a01_le"
     , "j_uppercheek_a09_ri", "j_uppercheek_a09_le", "j_uppercheek_a08_ri"
-]
+])
 
 def mark_cosmetic(bone, name):
     bone.cosmetic = name in tbl_cosmetics
@@ -508,55 +514,15 @@ def save_model(self, context, filepath, armature, objects,
 
     model = XModel.Model("$export")
 
-    meshes = []
-    materials = []
-
-    for ob in objects:
-        # Set up modifiers whether to apply deformation or not
-        mod_states = []
-        for mod in ob.modifiers:
-            mod_states.append(mod.show_viewport)
-            if mod.type == 'ARMATURE':
-                mod.show_viewport = (mod.show_viewport and
-                                     use_armature_pose)
-            else:
-                mod.show_viewport = (mod.show_viewport and
-                                     apply_modifiers)
-
-        # to_mesh() applies enabled modifiers only
-        try:
-            # NOTE There's no way to get a 'render' depsgraph for now
-            depsgraph = context.evaluated_depsgraph_get()
-            mesh = ob.evaluated_get(depsgraph).to_mesh()
-        except RuntimeError:
-            mesh = None
-
-        if mesh is None:
-            continue
-
-        # Triangulate the mesh (Appears to keep split normals)
-        #  Also remove all loose verts (Vertex Cleanup)
-        mesh_triangulate(mesh, use_vertex_cleanup)
-
-        # Should we have an arg for this? It seems to be automatic...
-        use_split_normals = True
-        if use_split_normals:
-            mesh.calc_normals_split()
-
-        # Restore modifier settings
-        for i, mod in enumerate(ob.modifiers):
-            mod.show_viewport = mod_states[i]
-
-        meshes.append(ExportMesh(ob, mesh, materials))
-
     # Build the bone hierarchy & transform matrices
     if use_armature and armature is not None:
         armature_matrix = armature.matrix_world
         bone_table = [b.name for b in armature.data.bones]
+        bone_indices = {name: index for index, name in enumerate(bone_table)}
         for bone_index, bone in enumerate(armature.data.bones):
             if bone.parent is not None:
-                if bone.parent.name in bone_table:
-                    bone_parent_index = bone_table.index(bone.parent.name)
+                if bone.parent.name in bone_indices:
+                    bone_parent_index = bone_indices[bone.parent.name]
                 else:
                     # TODO: Add some sort of useful warning for when we try
                     #  to export a bone that isn't actually in the bone table
@@ -592,15 +558,61 @@ def save_model(self, context, filepath, armature, objects,
         model.bones.append(dummy_bone)
         bone_table = [dummy_bone_name]
 
-    # Generate bone weights for verts
+    # Bone weights are generated for the verts of each mesh as it's converted
     if not use_weight_min:
         use_weight_min_threshold = 0.0
-    for mesh in meshes:
-        mesh.add_weights(bone_table, use_weight_min_threshold)
+
+    materials = {}
+
+    for ob in objects:
+        # Set up modifiers whether to apply deformation or not
+        # (Modifiers are only written to when their state actually changes,
+        #  as setting show_viewport tags the object for re-evaluation)
+        mod_states = []
+        for mod in ob.modifiers:
+            show_viewport = mod.show_viewport
+            mod_states.append(show_viewport)
+            if mod.type == 'ARMATURE':
+                enabled = show_viewport and use_armature_pose
+            else:
+                enabled = show_viewport and apply_modifiers
+            if enabled != show_viewport:
+                mod.show_viewport = enabled
+
+        # to_mesh() applies enabled modifiers only
+        try:
+            # NOTE There's no way to get a 'render' depsgraph for now
+            depsgraph = context.evaluated_depsgraph_get()
+            mesh = ob.evaluated_get(depsgraph).to_mesh()
+        except RuntimeError:
+            mesh = None
+
+        if mesh is None:
+            continue
+
+        # Triangulate the mesh (Appears to keep split normals)
+        #  Also remove all loose verts (Vertex Cleanup)
+        mesh_triangulate(mesh, use_vertex_cleanup)
+
+        # Should we have an arg for this? It seems to be automatic...
+        use_split_normals = True
+        if use_split_normals:
+            mesh.calc_normals_split()
+
+        # Convert the mesh right away, so that its data can be freed
+        #  before moving on to the next object
+        export_mesh = ExportMesh(ob, mesh, materials)
+        export_mesh.add_weights(bone_table, use_weight_min_threshold)
         model.meshes.append(
-            mesh.to_xmodel_mesh(use_vertex_colors_alpha,
-                                use_vertex_colors_alpha_mode,
-                                global_scale))
+            export_mesh.to_xmodel_mesh(use_vertex_colors_alpha,
+                                       use_vertex_colors_alpha_mode,
+                                       global_scale))
+        export_mesh.clear(depsgraph)
+
+        # Restore modifier settings
+        for mod, show_viewport in zip(ob.modifiers, mod_states):
+            if mod.show_viewport != show_viewport:
+                mod.show_viewport = show_viewport
 
     missing_count = 0
     for material in materials:
@@ -25,6 +25,10 @@ from mathutils import *
 from . import shared as shared
 from .PyCoD import xanim as XAnim
 
+# keyframe_insert() replaces an existing key that is closer than this
+#  to the new key's frame (BEZT_BINARYSEARCH_THRESH in Blender)
+KEYFRAME_REPLACE_THRESHOLD = 0.01
+
 
 def get_mat_offs(bone):
     # Based on the following: http://blender.stackexchange.com/a/44980
@@ -35,13 +39,13 @@ def get_mat_offs(bone):
     return mat_offs
 
 
-def get_mat_rest(pose_bone, mat_pose_parent, mat_local_parent):
+def get_mat_rest(pose_bone, mat_pose_parent, mat_local_parent, mat_offs):
     # Based on the following: http://blender.stackexchange.com/a/44980
+    # mat_offs is the result of get_mat_offs() for the bone
+    #  (it only depends on the rest pose, so it's calculated once per bone)
     bone = pose_bone.bone
 
     if pose_bone.parent:
-        mat_offs = get_mat_offs(bone)
-
         # --------- rotscale
         if (not bone.use_inherit_rotation and not bone.use_inherit_scale):
             mat_rotscale = mat_local_parent @ mat_offs
@@ -83,17 +87,94 @@ def get_mat_rest(pose_bone, mat_pose_parent, mat_local_parent):
     return mat_rotscale, mat_loc
 
 
-def calc_basis(pose_bone, matrix, parent_mtx, parent_mtx_local):
+def calc_basis(pose_bone, matrix, parent_mtx, parent_mtx_local, mat_offs):
     # Based on the following: http://blender.stackexchange.com/a/44980
     mat_rotscale, mat_loc = get_mat_rest(pose_bone,
                                          parent_mtx,
-                                         parent_mtx_local)
+                                         parent_mtx_local,
+                                         mat_offs)
     basis = (matrix.to_3x3().inverted() @ mat_rotscale.to_3x3()).transposed()
     basis.resize_4x4()
     basis.translation = mat_loc.inverted() @ matrix.translation
     return basis
 
 
+def merge_keyframes(frames):
+    '''
+    Merge the frames that keyframe_insert() would put on the same key
+    Returns the key frames and, for each key, the index of the value
+     that ends up on it (the last one inserted, since it replaces the rest)
+    '''
+    key_frames = []
+    key_indices = []
+    for value_index, frame in sorted(enumerate(frames),
+                                     key=lambda item: item[1]):
+        if (key_frames and
+                frame - key_frames[-1] < KEYFRAME_REPLACE_THRESHOLD):
+            key_indices[-1] = max(key_indices[-1], value_index)
+        else:
+            key_frames.append(frame)
+            key_indices.append(value_index)
+    return key_frames, key_indices
+
+
+def get_keyframe_defaults():
+    '''
+    Get the user's default interpolation & handle type for new keyframes
+    Returned as the enum values that foreach_set() expects
+    '''
+    edit = bpy.context.preferences.edit
+    props = bpy.types.Keyframe.bl_rna.properties
+    interpolation = props['interpolation'].enum_items[
+        edit.keyframe_new_interpolation_type].value
+    handle_type = props['handle_left_type'].enum_items[
+        edit.keyframe_new_handle_type].value
+    return interpolation, handle_type
+
+
+def insert_keyframes(action, pose_bone, prop, frames, values, size):
+    '''
+    Key each component of the given pose bone property at every frame
+    values holds the flattened (size components per frame) property values
+    '''
+    data_path = pose_bone.path_from_id(prop)
+    fcurves = action.fcurves
+    key_frames = None
+    for index in range(size):
+        fcurve = fcurves.find(data_path, index=index)
+        if fcurve is None:
+            fcurve = fcurves.new(data_path, index=index,
+                                 action_group=pose_bone.name)
+
+        component = values[index::size]
+        points = fcurve.keyframe_points
+        if len(points) == 0:
+            # Add all of the keyframes at once
+            # Frames that land on the same key are merged first, otherwise
+            #  they'd end up as duplicate keys
+            if key_frames is None:
+                key_frames, key_indices = merge_keyframes(frames)
+                key_count = len(key_frames)
+                # points.add() doesn't apply the user's keyframe defaults
+                #  like insert() does, so they're set explicitly
+                interpolation, handle_type = get_keyframe_defaults()
+                interpolations = [interpolation] * key_count
+                handle_types = [handle_type] * key_count
+            key_values = [component[i] for i in key_indices]
+            points.add(key_count)
+            points.foreach_set('co', [v for co in zip(key_frames, key_values)
+                                      for v in co])
+            points.foreach_set('interpolation', interpolations)
+            points.foreach_set('handle_left_type', handle_types)
+            points.foreach_set('handle_right_type', handle_types)
+        else:
+            # Any existing keys on the same frames need to be replaced
+            for frame, value in zip(frames, component):
+                points.insert(frame, value, options={'FAST'})
+        # Sorts the keys & recalculates their handles
+        fcurve.update()
+
+
 def find_active_armature(context):
     ob = bpy.context.active_object
     if ob is None:
@@ -184,6 +265,11 @@ def load_anim(self, context, armature,
         action = bpy.data.actions.new(actionName)
         ob.animation_data.action = action
         ob.animation_data.action.use_fake_user = True
+    else:
+        action = ob.animation_data.action
+        if action is None:
+            action = bpy.data.actions.new(ob.name + "Action")
+            ob.animation_data.action = action
 
     if update_scene_fps:
         scene.render.fps = anim.framerate
@@ -211,7 +297,8 @@ def load_anim(self, context, armature,
 
     # Used to store bone metadata & matrix info for each animated bone
     class MappedBone(object):
-        __slots__ = ('bone', 'part_index', 'matrix', 'matrix_local', 'parent')
+        __slots__ = ('bone', 'part_index', 'matrix', 'matrix_local', 'parent',
+                     'mat_offs', 'locations', 'rotations')
 
         def __init__(self, pose_bone, part_index):
             self.bone = pose_bone
@@ -220,17 +307,26 @@ def load_anim(self, context, armature,
             self.matrix_local = pose_bone.bone.matrix_local
             self.parent = None
 
-        def map_parent(self, bone_map):
+            # The rest offset from the parent doesn't change between frames
+            if pose_bone.parent:
+                self.mat_offs = get_mat_offs(pose_bone.bone)
+            else:
+                self.mat_offs = None
+
+            # The flattened location / rotation values for every frame
+            self.locations = []
+            self.rotations = []
+
+        def map_parent(self, mapped_bones):
             # Traverses the parents of the current bone recursively until -
             # one that is present in the anim is found
             # If none can be found, self.parent is set to None
-            bone_names = [mapped_bone.bone.name for mapped_bone in bone_map]
-
+            # mapped_bones maps bone names to the already mapped bones
             bone = self.bone
             while bone is not None:
-                if bone.name in bone_names:
-                    parent_index = bone_names.index(bone.name)
-                    self.parent = bone_map[parent_index]
+                parent = mapped_bones.get(bone.name)
+                if parent is not None:
+                    self.parent = parent
                     return
                 bone = bone.parent
             self.parent = None
@@ -241,24 +337,33 @@ def load_anim(self, context, armature,
     # which stores them in hierarchical order, meaning a bone's parent -
     # will always be *earlier* in the list than the child
     bone_map = []
-    part_names = [part.name.lower() for part in anim.parts]
+    mapped_bones = {}
+    # Map each part name to its (first) part index
+    part_indices = {}
+    for part_index, part in enumerate(anim.parts):
+        part_indices.setdefault(part.name.lower(), part_index)
     for bone_index, bone in enumerate(ob.pose.bones):
-        if bone.name in part_names:
-            part_index = part_names.index(bone.name)
+        if bone.name in part_indices:
+            part_index = part_indices[bone.name]
             # Don't add bones that didn't have a matching part in the anim
             if part_index is not None:
                 mapped_bone = MappedBone(bone, part_index)
-                mapped_bone.map_parent(bone_map)
+                mapped_bone.map_parent(mapped_bones)
 
                 bone_map.append(mapped_bone)
+                mapped_bones[bone.name] = mapped_bone
             else:
                 # If the bone isn't used in the anim
                 #  simply reset it to its rest pose
                 bone.matrix_basis.identity()
 
-    # Load the keyframes
+    # Evaluate the pose for each frame, the keyframes are written
+    #  in bulk afterwards
+    frame_numbers = []
+    identity_matrix = Matrix()
     for frame in anim.frames:
         f = frame.frame * frame_scale + frame_shift
+        frame_numbers.append(f)
 
         for mapped_bone in bone_map:
             # Because a bone's parent is always *before* the child in bone_map
@@ -269,8 +374,8 @@ def load_anim(self, context, armature,
                 parent_matrix = mapped_bone_parent.matrix
                 parent_local_matrix = mapped_bone_parent.matrix_local
             else:
-                parent_matrix = Matrix()
-                parent_local_matrix = parent_matrix
+                parent_matrix = identity_matrix
+                parent_local_matrix = identity_matrix
 
             part = frame.parts[mapped_bone.part_index]
             mtx = Matrix(part.matrix).transposed().to_4x4()
@@ -283,11 +388,19 @@ def load_anim(self, context, armature,
             matrix_basis = calc_basis(bone,
                                       mtx,
                                       parent_matrix,
-                                      parent_local_matrix)
+                                      parent_local_matrix,
+                                      mapped_bone.mat_offs)
             bone.matrix_basis = matrix_basis.copy()
 
-            bone.keyframe_insert("location", index=-1, frame=f)
-            bone.keyframe_insert("rotation_quaternion", index=-1, frame=f)
+            mapped_bone.locations.extend(bone.location)
+            mapped_bone.rotations.extend(bone.rotation_quaternion)
+
+    # Load the keyframes
+    for mapped_bone in bone_map:
+        insert_keyframes(action, mapped_bone.bone, "location",
+                         frame_numbers, mapped_bone.locations, 3)
+        insert_keyframes(action, mapped_bone.bone, "rotation_quaternion",
+                         frame_numbers, mapped_bone.rotations, 4)
 
     # Load the notes
     if use_notetracks:
@@ -20,10 +20,7 @@
 
 import os
 import bpy
-import bmesh
-import array
-from mathutils import *
-from math import *
+import numpy
 from bpy_extras.image_utils import load_image
 
 from . import shared as shared
@@ -88,12 +85,18 @@ def load(self, context,
 
     LoadModelFile(filepath, split_meshes=split_meshes)
 
+    # Blender's bone & vertex group names for each of the model's bones
+    bone_names = [bone.name.lower() for bone in model.bones]
+
     # Materials
     # List of the materials that Blender has loaded
     materials = []
     # Map of images to their instances in Blender
     #  (or None if they failed to load)
     material_images = {}
+    # Blender's images by name, so they don't have to be looked up in
+    #  bpy.data.images for every image reference
+    images = {image.name: image for image in bpy.data.images}
 
     for material in model.materials:
         mat = bpy.data.materials.get(material.name)
@@ -126,8 +129,10 @@ def load(self, context,
                                                check_existing=True,
                                                place_holder=True)
                         material_images[image_name] = image
-                    elif image_name in bpy.data.images:
-                        image = bpy.data.images[image_name]
+                        if image is not None:
+                            images[image.name] = image
+                    elif image_name in images:
+                        image = images[image_name]
                     else:
                         image = material_images[image_name]
 
@@ -183,25 +188,14 @@ def load(self, context,
         materials.append(mat)
 
     # Meshes
+    # The tris' corners get reordered by this to fix the winding order
+    winding_order = [0, 2, 1]
     mesh_objs = []  # Mesh objects that we're going to link the skeleton to
     for sub_mesh in model.meshes:
         if split_meshes is False:
             sub_mesh.name = "%s_mesh" % model.name
         print("Creating mesh: '%s'" % sub_mesh.name)
         mesh = bpy.data.meshes.new(sub_mesh.name)
-        bm = bmesh.new()
-
-        # Add UV Layers
-        uv_layer = bm.loops.layers.uv.new("UVMap")
-
-        # Add Vertex Color Layer
-        if use_vertex_colors:
-            vert_color_layer = bm.loops.layers.color.new("Color")
-
-        # Add Verts
-        for vert in sub_mesh.verts:
-            bm.verts.new(Vector(vert.offset) * target_scale)
-        bm.verts.ensure_lookup_table()
 
         # Contains data for faces that use the same 3 verts as an existing face
         #  (usually caused by `double sided` tris)
@@ -209,120 +203,138 @@ def load(self, context,
         dup_verts = []
 
         # Contains vertex mapping data for all verts that the dup faces use
-        dup_verts_mapping = [None] * len(sub_mesh.verts)
+        dup_verts_mapping = {}
 
         used_faces = []  # List of all faces that were used in the model
 
-        loop_normals = []  # List of normals for every added loop (face vertex)
+        # The vertex sets of every used face, Blender doesn't allow two faces
+        #  to use the same verts
+        used_face_verts = set()
 
-        # Tracks how many faces in the current mesh use a given material
-        material_usage_counts = [0] * len(materials)
-
-        # Inner function used set up a bmesh tri's normals (into loop_normals),
-        #  uv, materials, etc.
-        def setup_tri(f):
-            # Assign the face's material & increment the material usage counter
-            material_index = face.material_id
-            f.material_index = material_index
-
-            material_usage_counts[material_index] += 1
-
-            # Assign the face's UV layer
-            for loop_index, loop in enumerate(f.loops):
-                face_index_loop = face.indices[loop_index]
-                # Normal
-                loop_normals.append(face_index_loop.normal)
-                # UV Coordinate Correction
-                uv = Vector(face_index_loop.uv)
-                uv.y = 1.0 - uv.y
-                loop[uv_layer].uv = uv
-                # Vertex Colors
-                if use_vertex_colors:
-                    loop[vert_color_layer] = face_index_loop.color
-
-            used_faces.append(face)
-
-        unused_faces = []
+        has_unused_faces = False
 
         vert_count = len(sub_mesh.verts)
         for face_index, face in enumerate(sub_mesh.faces):
-            # Fix the winding order
-            tmp = face.indices[2]
-            face.indices[2] = face.indices[1]
-            face.indices[1] = tmp
-
-            indices = [bm.verts[index.vertex] for index in face.indices]
-
-            try:
-                f = bm.faces.new(indices)
-            except ValueError:
-                # Mark the face as unused
-                unused_faces.append(face)
-
-                if not face.isValid():
-                    print("TRI %d is invalid! %s" %
-                          (face_index, [index.vertex for index in face.indices]))
-                    continue
-
-                for index in face.indices:
-                    vert = index.vertex
-                    if dup_verts_mapping[vert] is None:
-                        dup_verts_mapping[vert] = len(dup_verts) + vert_count
-                        dup_verts.append(sub_mesh.verts[vert])
-                    index.vertex = dup_verts_mapping[vert]
-                dup_faces.append(face)
-            else:
-                setup_tri(f)
+            face_verts = frozenset([index.vertex for index in face.indices])
+            if len(face_verts) == 3 and face_verts not in used_face_verts:
+                used_face_verts.add(face_verts)
+                used_faces.append(face)
+                continue
+
+            # Mark the face as unused
+            has_unused_faces = True
+
+            if not face.isValid():
+                print("TRI %d is invalid! %s" %
+                      (face_index, [index.vertex for index in face.indices]))
+                continue
+
+            for index in face.indices:
+                vert = index.vertex
+                if vert not in dup_verts_mapping:
+                    dup_verts_mapping[vert] = len(dup_verts) + vert_count
+                    dup_verts.append(sub_mesh.verts[vert])
+                index.vertex = dup_verts_mapping[vert]
+            dup_faces.append(face)
 
         # Remove the unused tris so they aren't accidentally used later
-        for face in unused_faces:
-            sub_mesh.faces.remove(face)
+        # At this point used_faces holds every other face in their original
+        #  order, so it's copied rather than removing the faces one by one
+        if has_unused_faces:
+            sub_mesh.faces = used_faces[:]
 
         if use_dup_tris:
-            for vert in dup_verts:
-                bm.verts.new(Vector(vert.offset) * target_scale)
-            bm.verts.ensure_lookup_table()
+            mesh_verts = sub_mesh.verts + dup_verts
 
             for face in dup_faces:
-                indices = [bm.verts[index.vertex] for index in face.indices]
-                try:
-                    f = bm.faces.new(indices)
-                except ValueError:
-                    pass  # Skip dups of dups
-                else:
-                    setup_tri(f)
+                face_verts = frozenset([index.vertex
+                                        for index in face.indices])
+                if face_verts in used_face_verts:
+                    continue  # Skip dups of dups
+                used_face_verts.add(face_verts)
+                used_faces.append(face)
+        else:
+            mesh_verts = sub_mesh.verts
 
-        # Vertex Weights
-        deform_layer = bm.verts.layers.deform.new()
-        for vert_index, vert in enumerate(sub_mesh.verts):
-            for bone, weight in vert.weights:
-                bm.verts[vert_index][deform_layer][bone] = weight
+        # Add Verts
+        vert_count = len(mesh_verts)
+        coords = numpy.fromiter((coord
+                                 for vert in mesh_verts
+                                 for coord in vert.offset),
+                                dtype=numpy.float32, count=vert_count * 3)
+        coords *= target_scale
+        mesh.vertices.add(vert_count)
+        mesh.vertices.foreach_set("co", coords)
+
+        # Add Faces
+        face_count = len(used_faces)
+        loop_count = face_count * 3
+        loop_verts = numpy.fromiter((index.vertex
+                                     for face in used_faces
+                                     for index in face.indices),
+                                    dtype=numpy.int32, count=loop_count)
+        loop_verts = loop_verts.reshape(-1, 3)[:, winding_order].ravel()
+        mesh.loops.add(loop_count)
+        mesh.loops.foreach_set("vertex_index", loop_verts)
+
+        mesh.polygons.add(face_count)
+        mesh.polygons.foreach_set(
+            "loop_start", numpy.arange(0, loop_count, 3, dtype=numpy.int32))
+        mesh.polygons.foreach_set(
+            "loop_total", numpy.full(face_count, 3, dtype=numpy.int32))
+
+        # Assign the material indices
+        material_indices = numpy.fromiter((face.material_id
+                                           for face in used_faces),
+                                          dtype=numpy.int32, count=face_count)
+        mesh.polygons.foreach_set("material_index", material_indices)
+
+        mesh.update(calc_edges=True)
+
+        # List of normals for every added loop (face vertex)
+        loop_normals = numpy.fromiter((coord
+                                       for face in used_faces
+                                       for index in face.indices
+                                       for coord in index.normal),
+                                      dtype=numpy.float32,
+                                      count=loop_count * 3)
+        loop_normals = loop_normals.reshape(-1, 3, 3)[:, winding_order].ravel()
 
-        if use_dup_tris:
-            offset = len(sub_mesh.verts)
-            for vert_index, vert in enumerate(dup_verts):
-                for bone, weight in vert.weights:
-                    bm.verts[vert_index + offset][deform_layer][bone] = weight
+        # Add UV Layers
+        uvs = numpy.fromiter((coord
+                              for face in used_faces
+                              for index in face.indices
+                              for coord in index.uv),
+                             dtype=numpy.float32, count=loop_count * 2)
+        uvs = uvs.reshape(-1, 3, 2)[:, winding_order].ravel()
+        # UV Coordinate Correction
+        uvs[1::2] = 1.0 - uvs[1::2]
+        mesh.uv_layers.new(name="UVMap").data.foreach_set("uv", uvs)
+
+        # Add Vertex Color Layer
+        if use_vertex_colors:
+            white = (1.0, 1.0, 1.0, 1.0)
+            colors = numpy.fromiter((value
+                                     for face in used_faces
+                                     for index in face.indices
+                                     for value in index.color or white),
+                                    dtype=numpy.float32, count=loop_count * 4)
+            colors = colors.reshape(-1, 3, 4)[:, winding_order].ravel()
+            vert_color_layer = mesh.vertex_colors.new(name="Color")
+            vert_color_layer.data.foreach_set("color", colors)
 
         # Assign Materials
         for mat in materials:
             mesh.materials.append(mat)
 
-        bm.to_mesh(mesh)
-
         # For this mesh remove all materials that aren't used by its faces
-        # material_index, material_usage_index must be tracked manually because
-        # enumerate() doesn't compensate for the removed materials properly
-        material_index = 0
-        material_usage_index = 0
-        for material in mesh.materials:
-            if material_usage_counts[material_usage_index] == 0:
-                # Note: update_data must be True, otherwise - after the first
-                #  material is removed, the indices are invalidated
-                mesh.materials.pop(index=material_index)
-            else:
-                material_index += 1
-            material_usage_index += 1
+        # They're removed from last to first so that the indices of the
+        #  materials that haven't been checked yet stay valid
+        material_usage_counts = numpy.bincount(material_indices,
+                                               minlength=len(materials))
+        unused_materials = numpy.flatnonzero(material_usage_counts == 0)
+        for material_index in reversed(unused_materials.tolist()):
+            mesh.materials.pop(index=material_index)
 
         # Custom Normals
         if use_custom_normals:
@@ -331,23 +343,22 @@ def load(self, context,
             # We can only set custom loop normals *after* calling it.
             mesh.create_normals_split()
 
-            # Iterate over every single loop (every vert for every face)
-            for loop_index, loop in enumerate(mesh.loops):
-                mesh.loops[loop_index].normal = loop_normals[loop_index]
+            mesh.loops.foreach_set("normal", loop_normals)
 
             # *Very* important to not remove loop normals here!
             mesh.validate(clean_customdata=False)
 
             # mesh.free_normals_split() # Is this necessary?
 
-            clnors = array.array('f', [0.0] * (len(mesh.loops) * 3))
+            clnors = numpy.empty(len(mesh.loops) * 3, dtype=numpy.float32)
             mesh.loops.foreach_get("normal", clnors)
 
             # Enable Smoothing - must be BEFORE normals_split_custom_set, etc.
             polygon_count = len(mesh.polygons)
-            mesh.polygons.foreach_set("use_smooth", [True] * polygon_count)
+            mesh.polygons.foreach_set("use_smooth",
+                                      numpy.ones(polygon_count, dtype=bool))
 
-            mesh.normals_split_custom_set(tuple(zip(*(iter(clnors),) * 3)))
+            mesh.normals_split_custom_set(clnors.reshape(-1, 3).tolist())
             mesh.use_auto_smooth = True
 
             # This was used to highlight sharp edges in legacy versions
@@ -361,7 +372,8 @@ def load(self, context,
 
             # Enable Smoothing
             polygon_count = len(mesh.polygons)
-            mesh.polygons.foreach_set("use_smooth", [True] * polygon_count)
+            mesh.polygons.foreach_set("use_smooth",
+                                      numpy.ones(polygon_count, dtype=bool))
 
             # Use Auto-generated Normals
             mesh.calc_normals()
@@ -371,17 +383,28 @@ def load(self, context,
         else:
             obj_name = model.name
 
-        # Create the model object and link it to the scene
+        # Create the model object
         obj = bpy.data.objects.new(obj_name, mesh)
         mesh_objs.append(obj)
 
-        scene.collection.objects.link(obj)
-        view_layer.objects.active = obj
-
         # Create Vertex Groups
-        # These automatically weight the verts based on the deform groups
-        for bone in model.bones:
-            obj.vertex_groups.new(name=bone.name.lower())
+        for bone_name in bone_names:
+            obj.vertex_groups.new(name=bone_name)
+
+        # Vertex Weights
+        # Verts are grouped by bone & weight so that each group only needs
+        #  one add() call per distinct weight value
+        bone_weights = {}
+        for vert_index, vert in enumerate(mesh_verts):
+            for bone, weight in vert.weights:
+                weights = bone_weights.setdefault(bone, {})
+                weights.setdefault(weight, []).append(vert_index)
+
+        vertex_groups = obj.vertex_groups
+        for bone, weights in bone_weights.items():
+            add = vertex_groups[bone].add
+            for weight, vert_indices in weights.items():
+                add(vert_indices, weight, 'REPLACE')
 
         # Assign the texture images to the current mesh (for Texture view)
         if load_images:
@@ -390,8 +413,7 @@ def load(self, context,
             for index, material in enumerate(model.materials):
                 if 'color' in material.images:
                     color_map = material.images['color']
-                    if color_map in bpy.data.images:
-                        material_image_map[index] = bpy.data.images[color_map]
+                    material_image_map[index] = images.get(color_map)
 
             # DEPRECATED
             '''
@@ -401,6 +423,13 @@ def load(self, context,
                 uv_faces[index].image = material_image_map[face.material_id]
             '''
 
+    # Link the mesh objects to the scene once they're all set up
+    link_object = scene.collection.objects.link
+    for obj in mesh_objs:
+        link_object(obj)
+    if mesh_objs:
+        view_layer.objects.active = mesh_objs[-1]
+
     if use_armature:
         # Create the skeleton
         armature = bpy.data.armatures.new("%s_amt" % model.name)
@@ -413,19 +442,25 @@ def load(self, context,
         scene.collection.objects.link(skel_obj)
         view_layer.objects.active = skel_obj
 
+        # Scale all of the bone heads & tails at once
+        bone_heads = numpy.array([bone.offset for bone in model.bones],
+                                 dtype=numpy.float32).reshape(-1, 3)
+        bone_axes = numpy.array([bone.matrix[1] for bone in model.bones],
+                                dtype=numpy.float32).reshape(-1, 3)
+        bone_heads *= target_scale
+        bone_tails = bone_heads + bone_axes * target_scale
+
         bpy.ops.object.mode_set(mode='EDIT')
 
-        for bone in model.bones:
-            edit_bone = armature.edit_bones.new(bone.name.lower())
+        for bone, bone_name, head, tail in zip(model.bones, bone_names,
+                                               bone_heads.tolist(),
+                                               bone_tails.tolist()):
+            edit_bone = armature.edit_bones.new(bone_name)
             edit_bone.use_local_location = False
 
-            offset = Vector(bone.offset) * target_scale
-            axis = Vector(bone.matrix[1]) * target_scale
-            roll = Vector(bone.matrix[2])
-
-            edit_bone.head = offset
-            edit_bone.tail = offset + axis
-            edit_bone.align_roll(roll)
+            edit_bone.head = head
+            edit_bone.tail = tail
+            edit_bone.align_roll(bone.matrix[2])
 
             if bone.parent != -1:
                 parent = armature.edit_bones[bone.parent]
@@ -18,19 +18,26 @@
 
 # <pep8 compliant>
 
-plugin_preferences = None
+
+def get_plugin_preferences():
+    '''
+    Get the addon's preferences
+    (Looked up on demand so a stale reference is never kept around)
+    '''
+    import bpy
+    return bpy.context.preferences.addons[__package__].preferences
 
 
 def get_metadata_string(filepath):
     import bpy
-    msg = "// Exported using Blender v%s\n" % bpy.app.version_string
-    msg += "// Export filename: '%s'\n" % filepath.replace("\\", "/")
-    if bpy.data.filepath is None:
-        source_file = "<none>"
-    else:
-        source_file = bpy.data.filepath.replace('\\', '/')
-    msg += "// Source filename: '%s'\n" % source_file
-    return msg
+    # bpy.data.filepath is an empty string for unsaved files
+    source_file = bpy.data.filepath or "<none>"
+    return ("// Exported using Blender v%s\n"
+            "// Export filename: '%s'\n"
+            "// Source filename: '%s'\n" %
+            (bpy.app.version_string,
+             filepath.replace("\\", "/"),
+             source_file.replace("\\", "/")))
 
 
 def calculate_unit_scale_factor(scene, apply_unit_scale=False):
@@ -46,6 +53,6 @@ def calculate_unit_scale_factor(scene, apply_unit_scale=False):
         return 1.0
 
     if scene.unit_settings.system != 'NONE':
-        return plugin_preferences.scale_length / 0.0254
+        return get_plugin_preferences().scale_length / 0.0254
     else:
         return scene.unit_settings.scale_length / 0.0254